@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import dis
+import functools
 import importlib._bootstrap
 import importlib.machinery
 import importlib.util
@@ -17,9 +18,9 @@ if TYPE_CHECKING:
     import typing as _t
     from _typeshed.importlib import MetaPathFinderProtocol as _MetaPathFinderProtocol
 
-    type _OpcodeInfo = (
-        tuple[_t.Literal["store"], tuple[str]] | tuple[_t.Literal["import"], tuple[str, list[str] | None, int]]
-    )
+    # Tagged with 0 for stores and 1 for imports.
+    # Fromlists are handed through as the tuples stored in co_consts.
+    type _OpcodeInfo = tuple[_t.Literal[0], str] | tuple[_t.Literal[1], str, tuple[str, ...] | None, int]
 
     _Any = _t.Any
     _ModuleT = _t.TypeVar("_ModuleT", bound=types.ModuleType)
@@ -29,6 +30,7 @@ if TYPE_CHECKING:
     class _DisModule(_t.Protocol):
         def _find_store_names(self, co: types.CodeType) -> _cabc.Generator[str]: ...
         def _find_imports(self, co: types.CodeType) -> _cabc.Generator[tuple[str, int, list[str] | None]]: ...
+        def _unpack_opargs(self, code: bytes) -> _cabc.Generator[tuple[_t.Any, ...]]: ...
 
     assert isinstance(dis, _DisModule)
 
@@ -43,31 +45,125 @@ else:
 _NEEDS_LOADING: _Any = object()
 
 
-def _scan_opcodes(code: types.CodeType) -> _cabc.Generator[_OpcodeInfo]:
-    """Scan the code, and yield 'interesting' opcode combinations."""
+# The same (name, package) pairs recur constantly, especially during fromlist expansion.
+_resolve_name = functools.lru_cache(maxsize=None)(importlib.util.resolve_name)
 
-    for name in dis._find_store_names(code):  # pyright: ignore [reportPrivateUsage]
-        yield ("store", (name,))
-    for name, level, fromlist in dis._find_imports(code):  # pyright: ignore [reportPrivateUsage]
-        yield ("import", (name, fromlist, level))
 
+_IMPORT_NAME = dis.opmap["IMPORT_NAME"]
+_STORE_OPS = frozenset((dis.opmap["STORE_NAME"], dis.opmap["STORE_GLOBAL"]))
+_HAS_CONST = frozenset(dis.hasconst)
+# 3.14+ loads small ints, e.g. an import's level, with LOAD_SMALL_INT, which carries the value as its argument.
+_LOAD_SMALL_INT = dis.opmap.get("LOAD_SMALL_INT", -1)
+
+
+@functools.lru_cache(maxsize=8192)
+def _scan_opcodes(code: types.CodeType) -> tuple[_OpcodeInfo, ...]:
+    """Scan the code, and return 'interesting' opcode combinations.
+
+    This does the work of dis._find_store_names() and dis._find_imports() in a single pass over the bytecode. Code
+    objects are immutable and hashable, so the result is cached per code object.
+    """
+
+    names = code.co_names
+    consts = code.co_consts
+    stores: list[_OpcodeInfo] = []
+    imports: list[_OpcodeInfo] = []
+
+    # An IMPORT_NAME is preceded by the loads of its level and fromlist, so track the two previous instructions.
+    level_op = level_arg = from_op = from_arg = None
+
+    # The tuples yielded by _unpack_opargs() gained an element in 3.13, but the last two are always (op, arg).
+    for *_, op, arg in dis._unpack_opargs(code.co_code):  # pyright: ignore [reportPrivateUsage]
+        if op == dis.EXTENDED_ARG:
+            continue
+
+        if op in _STORE_OPS:
+            stores.append((0, names[arg]))
+        elif op == _IMPORT_NAME and from_op in _HAS_CONST:
+            if level_op in _HAS_CONST:
+                imports.append((1, names[arg], consts[from_arg], consts[level_arg]))
+            elif level_op == _LOAD_SMALL_INT:
+                imports.append((1, names[arg], consts[from_arg], level_arg))
+
+        level_op, level_arg, from_op, from_arg = from_op, from_arg, op, arg
+
+    # Stores are reported first, as before, so star-imports in circular imports see the same global names.
+    return (*stores, *imports)
 
-def _replace_paths_in_code(code: types.CodeType, path_replacements: list[tuple[str, str]]) -> types.CodeType:
-    original_filename = os.path.normpath(code.co_filename)
 
-    for old_path, new_path in path_replacements:
-        if original_filename.startswith(old_path):
-            new_filename = original_filename.replace(old_path, new_path, 1)
-            break
-    else:
-        new_filename = original_filename
+@functools.lru_cache(maxsize=8192)
+def _nested_code(code: types.CodeType) -> tuple[types.CodeType, ...]:
+    """Return the code objects nested directly within the given code's constants."""
 
-    new_consts = list(code.co_consts)
-    for i, const in enumerate(new_consts):
+    return tuple(const for const in code.co_consts if isinstance(const, types.CodeType))
+
+
+def _scan_code_tree(code: types.CodeType) -> list[_OpcodeInfo]:
+    """Scan the code and all the code nested within it, and return the 'interesting' opcode combinations of all of it.
+
+    Nested code objects are walked with an explicit stack, in the same order as a recursive pre-order walk.
+    """
+
+    opcode_infos: list[_OpcodeInfo] = []
+    stack = [code]
+    while stack:
+        co = stack.pop()
+        opcode_infos.extend(_scan_opcodes(co))
+        stack.extend(reversed(_nested_code(co)))
+    return opcode_infos
+
+
+def _normalize_path_prefix(prefix: str) -> str:
+    # os.path.normpath() drops a trailing separator, which would make "/a/b/" match "/a/bc" as well.
+    norm_prefix = os.path.normpath(prefix)
+    if prefix.endswith((os.sep, os.altsep or os.sep)) and not norm_prefix.endswith(os.sep):
+        norm_prefix += os.sep
+    return norm_prefix
+
+
+def _replace_paths_in_code_tree(
+    code: types.CodeType,
+    path_replacements: list[tuple[str, str]],
+    old_paths: tuple[str, ...],
+) -> types.CodeType:
+    new_filename = code.co_filename
+
+    # str.startswith() can reject every prefix in one call, which is the common case.
+    original_filename = os.path.normpath(new_filename)
+    if original_filename.startswith(old_paths):
+        for old_path, new_path in path_replacements:
+            if original_filename.startswith(old_path):
+                new_filename = original_filename.replace(old_path, new_path, 1)
+                break
+
+    # Only copy the constants once a nested code object actually changes.
+    new_consts: list[object] | None = None
+    for i, const in enumerate(code.co_consts):
         if isinstance(const, types.CodeType):
-            new_consts[i] = _replace_paths_in_code(const, path_replacements)
+            new_const = _replace_paths_in_code_tree(const, path_replacements, old_paths)
+            if new_const is not const:
+                if new_consts is None:
+                    new_consts = list(code.co_consts)
+                new_consts[i] = new_const
+
+    if new_consts is not None:
+        return code.replace(co_consts=tuple(new_consts), co_filename=new_filename)
+    if new_filename != code.co_filename:
+        return code.replace(co_filename=new_filename)
+    return code
 
-    return code.replace(co_consts=tuple(new_consts), co_filename=new_filename)
+
+def _replace_paths_in_code(code: types.CodeType, path_replacements: list[tuple[str, str]]) -> types.CodeType:
+    """Replace path prefixes in the filenames of the code and its nested code.
+
+    The replacements are expected to be normalized already and sorted so that longer prefixes come first. Code objects
+    that aren't affected are returned as-is rather than copied.
+    """
+
+    if not path_replacements:
+        return code
+
+    return _replace_paths_in_code_tree(code, path_replacements, tuple(old_path for old_path, _ in path_replacements))
 
 
 # NOTE: Adapted from importlib._bootstrap._handle_fromlist().
@@ -76,7 +172,6 @@ def _handle_fromlist(
     fromlist: _cabc.Sequence[object],
     import_: _cabc.Callable[[str], _ModuleT],
     *,
-    recursive: bool = False,
     cached_modules: _cabc.Mapping[str, types.ModuleType] | None = None,
 ) -> _ModuleT:
     """Figure out what __import__ should return.
@@ -88,19 +183,26 @@ def _handle_fromlist(
     """
     # The hell that is fromlist ...
     # If a package was imported, try to import stuff from fromlist.
-    for x in fromlist:
+    # A star is expanded into the module's __all__ within the same loop instead of recursively, and each name is only
+    # tried once, even if it shows up in both.
+    pending: list[tuple[object, bool]] = [(x, False) for x in reversed(fromlist)]
+    seen: set[str] = set()
+    while pending:
+        x, from_all = pending.pop()
+
         if not isinstance(x, str):
-            if recursive:
+            if from_all:
                 where = module.__name__ + ".__all__"
             else:
                 where = "``from list''"
             raise TypeError(f"Item in {where} must be str, not {type(x).__name__}")
 
         elif x == "*":
-            if not recursive and hasattr(module, "__all__"):
-                _handle_fromlist(module, module.__all__, import_, recursive=True, cached_modules=cached_modules)
+            if not from_all and hasattr(module, "__all__"):
+                pending.extend((y, True) for y in reversed(module.__all__))
 
-        elif not hasattr(module, x):
+        elif x not in seen and not hasattr(module, x):
+            seen.add(x)
             from_name = f"{module.__name__}.{x}"
             try:
                 import_(from_name)
@@ -125,26 +227,23 @@ class MFModuleType(types.ModuleType):
         The module spec, which is always set.
     __code__: types.CodeType | None
         The unexecuted module code.
-    global_names: set[str]
-        The set of global names that are assigned to within the module. This includes those names imported through
-        star-imports of Python modules.
-    star_imports: set[str]
-        The set of star-imports this module did that could not be resolved, ie. a star-import from a non-Python module.
     """
 
+    # Stored in a slot rather than the module __dict__.
+    __slots__ = ("__code__",)
+
     __code__: types.CodeType | None
-    global_names: set[str]
-    star_imports: set[str]
 
 
-def _convert_to_mf_module(module: types.ModuleType) -> MFModuleType:
-    module.__class__ = MFModuleType
-    module = _typing_cast(MFModuleType, module)
+def _new_mf_module(spec: importlib.machinery.ModuleSpec) -> MFModuleType:
+    # NOTE: Modules with slots can't be made by reassigning __class__ on a module from
+    # importlib.util.module_from_spec(), so create one directly and initialize it the same way. This also avoids
+    # Loader.create_module(), which would load extension modules for real.
+    module = MFModuleType(spec.name)
+    importlib._bootstrap._init_module_attrs(spec, module)  # pyright: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
 
     # Initialize mf-specific module attributes.
     module.__code__ = None
-    module.global_names = set()
-    module.star_imports = set()
 
     return module
 
@@ -157,11 +256,17 @@ class ModuleFinder:
     path: list[str]
         A stand-in for `sys.path`. Defaults to `sys.path`.
     path_replacements: list[tuple[str, str]]
-        A list of (oldpath, newpath) tuples that will be replaced in module paths.
+        A list of (oldpath, newpath) tuples that will be replaced in module paths. The longest matching oldpath wins.
     modules: dict[str, MFModuleType]
         A stand-in for `sys.modules`.
     meta_path: list[_MetaPathFinderProtocol]
         A stand-in for `sys.meta_path`.
+    global_names: dict[str, set[str]]
+        A mapping of module names to the global names that are assigned to within the module. This includes those
+        names imported through star-imports of Python modules. Modules without any are absent.
+    star_imports: dict[str, set[str]]
+        A mapping of module names to the star-imports the module did that could not be resolved, ie. a star-import from
+        a non-Python module. Modules without any are absent.
     """
 
     def __init__(
@@ -172,68 +277,157 @@ class ModuleFinder:
     ) -> None:
         self.path: list[str] = path if (path is not None) else sys.path
         self.path_replacements: list[tuple[str, str]] = path_replacements if (path_replacements is not None) else []
+        # Normalize the prefixes up front instead of once per scanned code object, with longer ones first.
+        self._norm_replacements = sorted(
+            ((_normalize_path_prefix(old_path), new_path) for old_path, new_path in self.path_replacements),
+            key=lambda replacement: len(replacement[0]),
+            reverse=True,
+        )
         self.excludes: list[str] = excludes if (excludes is not None) else []
+        self._exclude_set = frozenset(self.excludes)
+        self._exclude_prefixes = tuple(f"{name}." for name in self.excludes)
         self.modules: dict[str, MFModuleType] = {}
         self.meta_path: list[_MetaPathFinderProtocol] = [importlib.machinery.PathFinder]
 
         self.bad_modules: dict[str, set[str]] = {}  # TODO
 
+        # Kept here rather than on each module so that sets are only allocated for modules that need them.
+        self.global_names: dict[str, set[str]] = {}
+        self.star_imports: dict[str, set[str]] = {}
+
+        # Caches for _import_module: (name, package) -> module for hits, and absolute names that no finder could find.
+        self._resolved: dict[tuple[str, str | None], MFModuleType] = {}
+        self._missing: set[str] = set()
+        # Package name -> submodule search locations, shared by all imports of the package's children.
+        self._search_locations: dict[str, list[str] | None] = {}
+
+    def _add_global(self, module_name: str, name: str) -> None:
+        self.global_names.setdefault(module_name, set()).add(name)
+
+    def _add_star_import(self, module_name: str, name: str) -> None:
+        self.star_imports.setdefault(module_name, set()).add(name)
+
     def _scan_code(self, code: types.CodeType, module: MFModuleType) -> None:  # noqa: PLR0912
-        for opcode_info in _scan_opcodes(code):
-            match opcode_info:
-                case ("store", (name,)):
-                    module.global_names.add(name)
-
-                case ("import", (name, fromlist, level)):
-                    if fromlist is not None:
-                        have_star = "*" in fromlist
-                        fromlist = [f for f in fromlist if f != "*"]
-                    else:
-                        have_star = False
-
-                    package = _typing_cast("str | None", importlib._bootstrap._calc___package__(module.__dict__))  # pyright: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
-                    absolute_name = importlib.util.resolve_name(("." * level) + name, package)
-                    try:
-                        self._import_module(absolute_name, None, fromlist)
-                    except (ImportError, SyntaxError):
-                        self.bad_modules.setdefault(absolute_name, set()).add(module.__name__)
-                        raise
-
-                    if have_star:
-                        # We've encountered an "import *". If it is a Python module,
-                        # the code has already been parsed and we can suck out the
-                        # global names.
-                        if (cached_mod := self.modules.get(name)) is not None:
-                            module.global_names |= cached_mod.global_names
-                            module.star_imports |= cached_mod.star_imports
-                            if cached_mod.__code__ is None:
-                                module.star_imports.add(name)
-                        else:
-                            module.star_imports.add(name)
-
-                case unknown:  # pyright: ignore [reportUnnecessaryComparison]
-                    # We don't expect anything else from the generator.
-                    raise RuntimeError(f"Unknown opcode info: {unknown!r}")
-
-        for const in code.co_consts:
-            if isinstance(const, types.CodeType):
-                self._scan_code(const, module)
+        # A module's package can't change while it's being scanned, so work it out once. Import names are resolved
+        # relative to it, and the same (name, level) pairs tend to recur across a module's code objects.
+        package = _typing_cast("str | None", importlib._bootstrap._calc___package__(module.__dict__))  # pyright: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
+        resolved_names: dict[tuple[str, int], str] = {}
+
+        # The opcode info is tagged with an int, which is cheaper to dispatch on than structural matching.
+        for opcode_info in _scan_code_tree(code):
+            if opcode_info[0] == 0:
+                self._add_global(module.__name__, opcode_info[1])
+                continue
+
+            _, name, fromlist, level = opcode_info
+            if fromlist is not None:
+                have_star = "*" in fromlist
+                # Only rebuild the fromlist in the uncommon case that it has a star in it.
+                if have_star:
+                    fromlist = tuple(f for f in fromlist if f != "*")
+            else:
+                have_star = False
+
+            try:
+                absolute_name = resolved_names[name, level]
+            except KeyError:
+                absolute_name = resolved_names[name, level] = _resolve_name(("." * level) + name, package)
+
+            try:
+                self._import_module(absolute_name, None, fromlist)
+            except (ImportError, SyntaxError):
+                self.bad_modules.setdefault(absolute_name, set()).add(module.__name__)
+                raise
+
+            if have_star:
+                # We've encountered an "import *". If it is a Python module,
+                # the code has already been parsed and we can suck out the
+                # global names.
+                if (cached_mod := self.modules.get(name)) is not None:
+                    if cached_names := self.global_names.get(name):
+                        self.global_names.setdefault(module.__name__, set()).update(cached_names)
+                    if cached_star_imports := self.star_imports.get(name):
+                        self.star_imports.setdefault(module.__name__, set()).update(cached_star_imports)
+                    if cached_mod.__code__ is None:
+                        self._add_star_import(module.__name__, name)
+                else:
+                    self._add_star_import(module.__name__, name)
 
     def _load_and_cache_module(self, name: str, spec: importlib.machinery.ModuleSpec) -> MFModuleType:
-        module = importlib.util.module_from_spec(spec)
-        module = _convert_to_mf_module(module)
+        module = _new_mf_module(spec)
+        # Cache the module before scanning it, so that circular imports find the partially populated module.
         self.modules[name] = module
 
-        loader = _typing_cast("importlib.abc.InspectLoader", spec.loader)
-        code = loader.get_code(module.__name__)
+        # Builtin and extension modules have no code to scan, so don't bother asking their loaders for it.
+        if spec.loader is importlib.machinery.BuiltinImporter or isinstance(
+            spec.loader, importlib.machinery.ExtensionFileLoader
+        ):
+            code = None
+        else:
+            loader = _typing_cast("importlib.abc.InspectLoader", spec.loader)
+            code = loader.get_code(module.__name__)
+
         if code is not None:
-            if self.path_replacements:
-                code = _replace_paths_in_code(code, self.path_replacements)
+            if self._norm_replacements:
+                code = _replace_paths_in_code(code, self._norm_replacements)
             module.__code__ = code
             self._scan_code(code, module)
 
         return module
 
+    def _is_excluded(self, absolute_name: str) -> bool:
+        return absolute_name in self._exclude_set or absolute_name.startswith(self._exclude_prefixes)
+
+    def _make_excluded_stub(self, name: str) -> MFModuleType:
+        """Create and cache a placeholder module for an excluded name without finding, loading, or scanning it."""
+
+        module = _new_mf_module(importlib.machinery.ModuleSpec(name, None))
+        self.modules[name] = module
+        return module
+
+    def _get_search_locations(self, package: MFModuleType) -> list[str] | None:
+        try:
+            return self._search_locations[package.__name__]
+        except KeyError:
+            assert package.__spec__ is not None
+            path = self._search_locations[package.__name__] = package.__spec__.submodule_search_locations
+            return path
+
+    def _find_spec(self, absolute_name: str, path: _cabc.Sequence[str] | None) -> importlib.machinery.ModuleSpec:
+        if absolute_name in self._missing:
+            msg = f"No module named {absolute_name!r}"
+            raise ModuleNotFoundError(msg, name=absolute_name)
+
+        for finder in self.meta_path:
+            spec = finder.find_spec(absolute_name, path)
+            if spec is not None:
+                return spec
+
+        self._missing.add(absolute_name)
+        msg = f"No module named {absolute_name!r}"
+        raise ModuleNotFoundError(msg, name=absolute_name)
+
+    def _import_child(self, parent: MFModuleType, child: str) -> MFModuleType:
+        """Import a submodule of an already imported package.
+
+        This skips the name resolution and parent traversal that _import_module() would redo for every fromlist item.
+        """
+
+        absolute_name = f"{parent.__name__}.{child}"
+
+        try:
+            return self.modules[absolute_name]
+        except KeyError:
+            pass
+
+        if self._is_excluded(absolute_name):
+            return self._make_excluded_stub(absolute_name)
+
+        spec = self._find_spec(absolute_name, self._get_search_locations(parent))
+        module = self._load_and_cache_module(absolute_name, spec)
+        setattr(parent, child, module)
+        return module
+
     def _import_module(
         self,
         name: str,
@@ -245,36 +439,54 @@ class ModuleFinder:
         Adapted from the importlib import_module() recipe.
         """
 
-        absolute_name = importlib.util.resolve_name(name, package)
+        try:
+            return self._resolved[name, package]
+        except KeyError:
+            pass
+
+        absolute_name = _resolve_name(name, package)
 
         try:
-            return self.modules[absolute_name]
+            module = self.modules[absolute_name]
         except KeyError:
             pass
+        else:
+            self._resolved[name, package] = module
+            return module
+
+        if self._is_excluded(absolute_name):
+            module = self._resolved[name, package] = self._make_excluded_stub(absolute_name)
+            return module
 
         path = self.path  # Override Pathfinder.find_spec's late default of sys.path.
+        parent_module = None
         if "." in absolute_name:
             parent_name, _, child_name = absolute_name.rpartition(".")
             parent_module = self._import_module(parent_name)
-            assert parent_module.__spec__ is not None
-            path = parent_module.__spec__.submodule_search_locations
+            path = self._get_search_locations(parent_module)
 
-        for finder in self.meta_path:
-            spec = finder.find_spec(absolute_name, path)
-            if spec is not None:
-                break
+            # Scanning the parent may have circled back and imported this module already. Reuse it instead of
+            # loading and scanning it a second time.
+            module = self.modules.get(absolute_name)
         else:
-            msg = f"No module named {absolute_name!r}"
-            raise ModuleNotFoundError(msg, name=absolute_name)
+            module = None
 
-        module = self._load_and_cache_module(absolute_name, spec)
+        if module is None:
+            spec = self._find_spec(absolute_name, path)
+            module = self._load_and_cache_module(absolute_name, spec)
 
-        if path is not None:
-            setattr(parent_module, child_name, module)  # pyright: ignore [reportPossiblyUnboundVariable]
+            if parent_module is not None:
+                setattr(parent_module, child_name, module)  # pyright: ignore [reportPossiblyUnboundVariable]
 
         if fromlist and hasattr(module, "__path__"):
-            return _handle_fromlist(module, fromlist, self._import_module, cached_modules=self.modules)
+            package_module = module
+
+            def import_child(from_name: str) -> MFModuleType:
+                return self._import_child(package_module, from_name.rpartition(".")[2])
+
+            module = _handle_fromlist(module, fromlist, import_child, cached_modules=self.modules)
 
+        self._resolved[name, package] = module
         return module
 
     def import_module(self, name: str, package: str | None = None, fromlist: _cabc.Sequence[str] | None = None) -> None:
@@ -6,8 +6,10 @@ from __future__ import annotations
 
 import collections.abc
 import dis
+import functools
 import importlib.util
 import importlib.machinery
+import itertools
 import os
 import sys
 import types
@@ -19,6 +21,53 @@ import typing as t
 _PKG_DIRECTORY = 5
 
 
+# 'suffixes' used to be a list hardcoded to [".py", ".pyc"].
+# But we must also collect Python extension modules - although
+# we cannot separate normal dlls from Python extensions.
+# Longer suffixes come first so that e.g. ".cpython-312-x86_64-linux-gnu.so" is stripped whole rather than just ".so".
+_MODULE_SUFFIXES = tuple(
+    sorted(
+        importlib.machinery.EXTENSION_SUFFIXES
+        + importlib.machinery.SOURCE_SUFFIXES
+        + importlib.machinery.BYTECODE_SUFFIXES,
+        key=len,
+        reverse=True,
+    )
+)
+
+
+_EXTENDED_ARG = dis.EXTENDED_ARG
+# Inline cache entries (3.11+) are zeroed out in co_code and aren't instructions.
+_CACHE = dis.opmap.get("CACHE", -1)
+_IMPORT_NAME = dis.opmap["IMPORT_NAME"]
+_STORE_OPS = frozenset((dis.opmap["STORE_NAME"], dis.opmap["STORE_GLOBAL"]))
+_HAS_CONST = frozenset(dis.hasconst)
+# 3.14+ loads small ints, e.g. an import's level, with LOAD_SMALL_INT, which carries the value as its argument.
+_LOAD_SMALL_INT = dis.opmap.get("LOAD_SMALL_INT", -1)
+_INTERESTING_OP_BYTES = tuple(bytes((op,)) for op in (_IMPORT_NAME, *_STORE_OPS))
+
+
+def _has_interesting_ops(co: types.CodeType) -> bool:
+    """Quickly check whether the code might contain any opcodes that scan_opcodes() cares about.
+
+    All of them take an index into co_names, so code without names can't have any. Otherwise, look for their bytes
+    in the (unspecialized) bytecode; a match in an argument byte just means a full scan happens anyway.
+    """
+
+    if not co.co_names:
+        return False
+    code = co.co_code
+    return any(op_byte in code for op_byte in _INTERESTING_OP_BYTES)
+
+
+# Built-in modules can't change while we run, so find their specs once.
+_find_builtin_spec = functools.lru_cache(maxsize=None)(importlib.machinery.BuiltinImporter.find_spec)
+
+
+# Nested code objects nearly always share the filename of their parent.
+_normpath = functools.lru_cache(maxsize=1024)(os.path.normpath)
+
+
 # Modulefinder does a good job at simulating Python's, but it can not
 # handle __path__ modifications packages make at runtime.  Therefore there
 # is a mechanism whereby you can register extra paths in this map for a
@@ -43,30 +92,10 @@ def replace_package(oldname: str, newname: str) -> None:
     _replace_package_map[oldname] = newname
 
 
-def _find_spec_from_path(
-    name: str, path: collections.abc.Sequence[str] | None = None
-) -> importlib.machinery.ModuleSpec:
-    """A wrapper around importlib.machinery.PathFinder.find_spec() (for our own purposes)."""
-
-    # It's necessary to clear the caches for our Finder first, in case any
-    # modules are being added/deleted/modified at runtime. In particular,
-    # test_modulefinder.py changes file tree contents in a cache-breaking way.
-    importlib.machinery.PathFinder.invalidate_caches()
-
-    spec = importlib.machinery.PathFinder.find_spec(name, path)
-
-    if spec is None:
-        msg = f"No module named {name!r}"
-        raise ImportError(msg, name=name)
-
-    if spec.loader is None:
-        msg = "missing loader"
-        raise ImportError(msg, name=name)
-
-    return spec
-
-
 class Module:
+    # Keep a __dict__ for the submodules that import_module() attaches as attributes and ensure_fromlist() checks for.
+    __slots__ = ("__code__", "__dict__", "__file__", "__name__", "__path__", "globalnames", "starimports")
+
     def __init__(self, name: str, file: str | None = None, path: list[str] | None = None) -> None:
         self.__name__: str = name
         self.__file__: str | None = file
@@ -106,8 +135,84 @@ class ModuleFinder:
         self.debug: int = debug
         self.indent: int = 0
         self.excludes: list[str] = excludes if (excludes is not None) else []
-        self.replace_paths: list[tuple[str, str]] = replace_paths if (replace_paths is not None) else []
+        # Longer prefixes come first so that the most specific replacement wins.
+        self.replace_paths: tuple[tuple[str, str], ...] = tuple(
+            sorted(replace_paths or (), key=lambda pair: len(pair[0]), reverse=True)
+        )
+        self._replace_prefixes: tuple[str, ...] = tuple(f for f, _ in self.replace_paths)
+        # Original (normalized) filename -> replaced filename, since nested code objects share their parent's filename.
+        self._replaced_filenames: dict[str, str] = {}
         self.processed_paths: list[str] = []  # Used in debugging only
+        self._spec_cache: dict[tuple[str, tuple[str, ...] | None], importlib.machinery.ModuleSpec | None] = {}
+        # (parent name, head) -> the head package find_head_package() settled on. Misses aren't cached, since the head
+        # package may still be added later on, e.g. by load_file().
+        self._head_cache: dict[tuple[str | None, str], Module] = {}
+        # Path entry -> the names of top-level modules/packages it might contain, or None if it can't be listed.
+        self._dir_index: dict[str, frozenset[str] | None] = {}
+
+        # Start from fresh finder caches, in case any modules were added/deleted/modified since they were filled. After
+        # that, lookups are cached until invalidate_caches() is called.
+        self.invalidate_caches()
+
+    def invalidate_caches(self) -> None:
+        """Clear the cached module lookups of this finder and of importlib.machinery.PathFinder.
+
+        Call this if files on the search path may have changed since they were last looked at.
+        """
+
+        self._spec_cache.clear()
+        self._head_cache.clear()
+        self._dir_index.clear()
+        importlib.machinery.PathFinder.invalidate_caches()
+
+    def _dirs_containing(self, name: str) -> list[str]:
+        """Return the entries of self.path that might contain a top-level module or package with the given name.
+
+        Each directory is listed once, so PathFinder doesn't have to check for every possible file in every directory.
+        Entries that can't be listed, e.g. zip files, are always included.
+        """
+
+        dir_index = self._dir_index
+        dirs: list[str] = []
+        for entry in self.path:
+            try:
+                names = dir_index[entry]
+            except KeyError:
+                try:
+                    with os.scandir(entry or ".") as it:
+                        # Anything before the first dot covers packages, namespace packages, and every module suffix.
+                        names = frozenset(dir_entry.name.partition(".")[0] for dir_entry in it)
+                except OSError:
+                    names = None
+                dir_index[entry] = names
+
+            if names is None or name in names:
+                dirs.append(entry)
+
+        return dirs
+
+    def _find_spec_from_path(
+        self,
+        name: str,
+        path: collections.abc.Sequence[str] | None = None,
+    ) -> importlib.machinery.ModuleSpec:
+        """A wrapper around importlib.machinery.PathFinder.find_spec() (for our own purposes)."""
+
+        key = (name, tuple(path) if (path is not None) else None)
+        try:
+            spec = self._spec_cache[key]
+        except KeyError:
+            spec = self._spec_cache[key] = importlib.machinery.PathFinder.find_spec(name, path)
+
+        if spec is None:
+            msg = f"No module named {name!r}"
+            raise ImportError(msg, name=name)
+
+        if spec.loader is None:
+            msg = "missing loader"
+            raise ImportError(msg, name=name)
+
+        return spec
 
     def msg(self, level: int, message: str, *args: object) -> None:
         if level <= self.debug:
@@ -149,15 +254,21 @@ class ModuleFinder:
     ) -> Module | None:
         self.msg(3, "import_hook", name, caller, fromlist, level)
 
-        parent = self.determine_parent(caller, level=level)
-        q, tail = self.find_head_package(parent, name)
-        m = self.load_tail(q, tail)
+        q, m = self._resolve_import(name, caller, level)
         if not fromlist:
             return q
         if m.__path__:
             self.ensure_fromlist(m, fromlist)
         return None
 
+    def _resolve_import(self, name: str, caller: Module | None, level: int) -> tuple[Module, Module]:
+        """Import the given name, and return both the head package and the module the full name refers to."""
+
+        parent = self.determine_parent(caller, level=level)
+        q, tail = self.find_head_package(parent, name)
+        m = self.load_tail(q, tail)
+        return q, m
+
     def determine_parent(self, caller: Module | None, level: int = -1) -> Module | None:
         self.msgin(4, "determine_parent", caller, level)
 
@@ -179,7 +290,7 @@ class ModuleFinder:
                 msg = "relative importpath too deep"
                 raise ImportError(msg)
 
-            pname = ".".join(pname.split(".")[:-level])
+            pname = pname.rsplit(".", level)[0]
             parent = self.modules[pname]
             self.msgout(4, "determine_parent ->", parent)
             return parent
@@ -206,32 +317,48 @@ class ModuleFinder:
 
         head, _, tail = name.partition(".")
 
+        # The same heads get looked up over and over, and a found head package doesn't change within a run. The tail
+        # depends on the full name, though, so it isn't part of the cache.
+        key = (parent.__name__ if parent else None, head)
+        try:
+            q = self._head_cache[key]
+        except KeyError:
+            q = self._find_head_package(parent, head)
+            if q is not None:
+                self._head_cache[key] = q
+
+        if q is None:
+            # The last attempt is always the top-level name.
+            self.msgout(4, "raise ImportError: No module named", head)
+            raise ImportError("No module named " + head)
+
+        self.msgout(4, "find_head_package ->", (q, tail))
+        return q, tail
+
+    def _find_head_package(self, parent: Module | None, head: str) -> Module | None:
+        import_module = self.import_module
+
         if parent:
             qname = f"{parent.__name__}.{head}"
         else:
             qname = head
 
-        if q := self.import_module(head, qname, parent):
-            self.msgout(4, "find_head_package ->", (q, tail))
-            return q, tail
+        if q := import_module(head, qname, parent):
+            return q
 
         if parent:
-            qname = head
-            parent = None
-            if q := self.import_module(head, qname, parent):
-                self.msgout(4, "find_head_package ->", (q, tail))
-                return q, tail
+            return import_module(head, head, None)
 
-        self.msgout(4, "raise ImportError: No module named", qname)
-        raise ImportError("No module named " + qname)
+        return None
 
     def load_tail(self, q: Module, tail: str) -> Module:
         self.msgin(4, "load_tail", q, tail)
+        import_module = self.import_module
         m = q
         while tail:
             head, _, tail = tail.partition(".")
             mname = f"{m.__name__}.{head}"
-            m = self.import_module(head, mname, m)
+            m = import_module(head, mname, m)
             if not m:
                 self.msgout(4, "raise ImportError: No module named", mname)
                 raise ImportError("No module named " + mname)
@@ -254,30 +381,24 @@ class ModuleFinder:
         if not m.__path__:
             return None
 
+        # A dict rather than a set, so that the submodules come out in the order they were found.
         modules: dict[str, str] = {}
-        # 'suffixes' used to be a list hardcoded to [".py", ".pyc"].
-        # But we must also collect Python extension modules - although
-        # we cannot separate normal dlls from Python extensions.
-        suffixes = (
-            importlib.machinery.EXTENSION_SUFFIXES
-            + importlib.machinery.SOURCE_SUFFIXES
-            + importlib.machinery.BYTECODE_SUFFIXES
-        )
         for dir_ in m.__path__:
             try:
-                names = os.listdir(dir_)
+                with os.scandir(dir_) as it:
+                    # The entry type usually comes from the directory listing itself, so this skips subdirectories
+                    # without a stat() call per name.
+                    names = [entry.name for entry in it if entry.is_file()]
             except OSError:
                 self.msg(2, "can't list directory", dir_)
                 continue
 
             for name in names:
-                for suff in suffixes:
-                    if name.endswith(suff):
-                        mod = name.removesuffix(suff)
-                        break
-                else:
-                    mod = None
+                # Let str.endswith() check all the suffixes in one go before looking for the one that matched.
+                if not name.endswith(_MODULE_SUFFIXES):
+                    continue
 
+                mod = next(name.removesuffix(suff) for suff in _MODULE_SUFFIXES if name.endswith(suff))
                 if mod and mod != "__init__":
                     modules[mod] = mod
 
@@ -285,11 +406,8 @@ class ModuleFinder:
 
     def import_module(self, partname: str, fqname: str, parent: Module | None) -> Module | None:
         self.msgin(3, "import_module", partname, fqname, parent)
-        try:
-            m = self.modules[fqname]
-        except KeyError:
-            pass
-        else:
+        m = self.modules.get(fqname)
+        if m is not None:
             self.msgout(3, "import_module ->", m)
             return m
         if fqname in self.badmodules:
@@ -330,15 +448,15 @@ class ModuleFinder:
         # else:
         #     co = None
 
-        _real_mod = importlib.util.module_from_spec(spec)
-
         assert spec.loader is not None
         assert hasattr(spec.loader, "get_code")
         co = spec.loader.get_code(fqname)
-        assert isinstance(co, types.CodeType)
+        # Built-in and extension modules don't have any code to scan.
+        assert co is None or isinstance(co, types.CodeType)
 
         m = self.add_module(fqname)
-        m.__file__ = _real_mod.__file__
+        # This is what importlib.util.module_from_spec() would set, without actually creating the module.
+        m.__file__ = spec.origin if spec.has_location else None
         if co:
             if self.replace_paths:
                 co = self.replace_paths_in_code(co)
@@ -352,29 +470,35 @@ class ModuleFinder:
 
     def _safe_import_hook(self, name: str, caller: Module | None, fromlist: list[str] | None, level: int = -1) -> None:
         # wrapper for self.import_hook() that won't raise ImportError
-        if name in self.badmodules:
-            self._add_badmodule(name, caller)
+        bad = self.badmodules
+        add_bad = self._add_badmodule
+        if name in bad:
+            add_bad(name, caller)
             return
+        self.msg(3, "import_hook", name, caller, fromlist, level)
         try:
-            self.import_hook(name, caller, level=level)
+            _, m = self._resolve_import(name, caller, level)
         except ImportError as msg:
             self.msg(2, "ImportError:", str(msg))
-            self._add_badmodule(name, caller)
+            add_bad(name, caller)
         except SyntaxError as msg:
             self.msg(2, "SyntaxError:", str(msg))
-            self._add_badmodule(name, caller)
+            add_bad(name, caller)
         else:
-            if fromlist:
+            # Resolve the name once, then go through the fromlist against the resulting package directly instead of
+            # re-importing the name for every item.
+            if fromlist and m.__path__:
+                ensure_fromlist = self.ensure_fromlist
                 for sub in fromlist:
                     fullname = name + "." + sub
-                    if fullname in self.badmodules:
-                        self._add_badmodule(fullname, caller)
+                    if fullname in bad:
+                        add_bad(fullname, caller)
                         continue
                     try:
-                        self.import_hook(name, caller, [sub], level=level)
+                        ensure_fromlist(m, [sub])
                     except ImportError as msg:
                         self.msg(2, "ImportError:", str(msg))
-                        self._add_badmodule(fullname, caller)
+                        add_bad(fullname, caller)
 
     def scan_opcodes(
         self,
@@ -385,62 +509,111 @@ class ModuleFinder:
         | tuple[t.Literal["relative_import"], tuple[int, list[str] | None, str]]
     ]:
         # Scan the code, and yield 'interesting' opcode combinations
-        for name in dis._find_store_names(co):  # pyright: ignore [reportAttributeAccessIssue, reportUnknownMemberType]
-            yield "store", (name,)
-        for name, level, fromlist in dis._find_imports(co):  # pyright: ignore [reportAttributeAccessIssue, reportUnknownMemberType]
+        if not _has_interesting_ops(co):
+            return
+
+        # This does the work of dis._find_store_names() and dis._find_imports() in a single pass over the bytecode.
+        # Stores are yielded as they're found; imports are yielded afterwards, in the same order as before.
+        names = co.co_names
+        consts = co.co_consts
+        imports: list[tuple[str, int, list[str] | None]] = []
+
+        # Read the (opcode, argument) byte pairs straight out of co_code instead of going through dis, which builds
+        # an object or tuple per instruction.
+        code = co.co_code
+        extended_arg = 0
+
+        # An IMPORT_NAME is preceded by the loads of its level and fromlist.
+        level_op = level_arg = from_op = from_arg = None
+        for op, op_arg in zip(code[::2], code[1::2], strict=True):
+            if op == _EXTENDED_ARG:
+                extended_arg = (extended_arg | op_arg) << 8
+                continue
+            if op == _CACHE:
+                continue
+            arg = op_arg | extended_arg
+            extended_arg = 0
+
+            if op in _STORE_OPS:
+                yield "store", (names[arg],)
+            elif op == _IMPORT_NAME and from_op in _HAS_CONST:
+                if level_op in _HAS_CONST:
+                    imports.append((names[arg], consts[level_arg], consts[from_arg]))
+                elif level_op == _LOAD_SMALL_INT:
+                    imports.append((names[arg], level_arg, consts[from_arg]))
+
+            level_op, level_arg, from_op, from_arg = from_op, from_arg, op, arg
+
+        for name, level, fromlist in imports:
             if level == 0:  # absolute import
                 yield "absolute_import", (fromlist, name)
             else:  # relative import
                 yield "relative_import", (level, fromlist, name)
 
-    def scan_code(self, co: types.CodeType, m: Module) -> None:  # noqa: PLR0912
+    def _handle_store(self, m: Module, name: str) -> None:
+        m.globalnames.add(name)
+
+    def _handle_absolute_import(self, m: Module, fromlist: list[str] | None, name: str) -> None:
+        have_star = 0
+        if fromlist is not None:
+            if "*" in fromlist:
+                have_star = 1
+            fromlist = [f for f in fromlist if f != "*"]
+        self._safe_import_hook(name, m, fromlist, level=0)
+        if have_star:
+            # We've encountered an "import *". If it is a Python module,
+            # the code has already been parsed and we can suck out the
+            # global names.
+            modules_get = self.modules.get
+            mm = None
+            if m.__path__:
+                # At this point we don't know whether 'name' is a
+                # submodule of 'm' or a global module. Let's just try
+                # the full name first.
+                mm = modules_get(m.__name__ + "." + name)
+
+            if mm is None:
+                mm = modules_get(name)
+
+            if mm is None:
+                m.starimports.add(name)
+            else:
+                m.globalnames |= mm.globalnames
+                m.starimports |= mm.starimports
+                if mm.__code__ is None:
+                    m.starimports.add(name)
+
+    def _handle_relative_import(self, m: Module, level: int, fromlist: list[str] | None, name: str) -> None:
+        if name:
+            self._safe_import_hook(name, m, fromlist, level=level)
+        else:
+            parent = self.determine_parent(m, level=level)
+            self._safe_import_hook(parent.__name__, None, fromlist, level=0)
+
+    # Maps the tags yielded by scan_opcodes() to the methods that handle their payloads.
+    _OP_DISPATCH: t.ClassVar[dict[str, collections.abc.Callable[..., None]]] = {
+        "store": _handle_store,
+        "absolute_import": _handle_absolute_import,
+        "relative_import": _handle_relative_import,
+    }
+
+    def scan_code(self, co: types.CodeType, m: Module) -> None:
         scanner = self.scan_opcodes
-        for args in scanner(co):
-            match args:
-                case ("store", (name,)):
-                    m.globalnames.add(name)
-                case ("absolute_import", (fromlist, name)):
-                    have_star = 0
-                    if fromlist is not None:
-                        if "*" in fromlist:
-                            have_star = 1
-                        fromlist = [f for f in fromlist if f != "*"]
-                    self._safe_import_hook(name, m, fromlist, level=0)
-                    if have_star:
-                        # We've encountered an "import *". If it is a Python module,
-                        # the code has already been parsed and we can suck out the
-                        # global names.
-                        mm = None
-                        if m.__path__:
-                            # At this point we don't know whether 'name' is a
-                            # submodule of 'm' or a global module. Let's just try
-                            # the full name first.
-                            mm = self.modules.get(m.__name__ + "." + name)
-
-                        if mm is None:
-                            mm = self.modules.get(name)
-
-                        if mm is None:
-                            m.starimports.add(name)
-                        else:
-                            m.globalnames |= mm.globalnames
-                            m.starimports |= mm.starimports
-                            if mm.__code__ is None:
-                                m.starimports.add(name)
-
-                case ("relative_import", (level, fromlist, name)):
-                    if name:
-                        self._safe_import_hook(name, m, fromlist, level=level)
-                    else:
-                        parent = self.determine_parent(m, level=level)
-                        self._safe_import_hook(parent.__name__, None, fromlist, level=0)
-                case (what, _):  # pyright: ignore [reportUnnecessaryComparison]
+        dispatch = self._OP_DISPATCH
+
+        # Walk the nested code objects with a worklist instead of recursing, in the same (pre-)order.
+        stack = [co]
+        while stack:
+            cur = stack.pop()
+            for what, payload in scanner(cur):
+                try:
+                    handler = dispatch[what]
+                except KeyError:
                     # We don't expect anything else from the generator.
-                    raise RuntimeError(what)
+                    raise RuntimeError(what) from None
+                handler(self, m, *payload)
 
-        for c in co.co_consts:
-            if isinstance(c, types.CodeType):
-                self.scan_code(c, m)
+            stack.extend(reversed([c for c in cur.co_consts if isinstance(c, types.CodeType)]))
 
     def load_package(self, fqname: str, spec: importlib.machinery.ModuleSpec) -> Module:
         self.msgin(2, "load_package", fqname, spec)
@@ -462,9 +635,10 @@ class ModuleFinder:
         return m
 
     def add_module(self, fqname: str) -> Module:
-        m = self.modules.get(fqname)
+        modules = self.modules
+        m = modules.get(fqname)
         if not m:
-            self.modules[fqname] = m = Module(fqname)
+            modules[fqname] = m = Module(fqname)
         return m
 
     def find_module(
@@ -484,46 +658,41 @@ class ModuleFinder:
             raise ImportError(name)
 
         if path is None:
-            if name in sys.builtin_module_names:
-                return None
+            # Top-level built-in modules are common, and BuiltinImporter finds them without looking through the path.
+            if name in sys.builtin_module_names and (spec := _find_builtin_spec(name)) is not None:
+                return spec
 
-            path = self.path
+            path = self._dirs_containing(name)
 
-        return _find_spec_from_path(name, path)
+        return self._find_spec_from_path(name, path)
 
     def report(self) -> None:
         """Print a report to stdout, listing the found modules with their
         paths, as well as modules that are missing, or seem to be missing.
         """
-        print()
-        print(f"  {'Name':25} File")
-        print(f"  {'----':25} ----")
+        # Build the whole report first and write it out in one go.
+        modules = self.modules
+        out = ["", f"  {'Name':25} File", f"  {'----':25} ----"]
         # Print modules found
-        keys = sorted(self.modules.keys())
-        for key in keys:
-            m = self.modules[key]
-            if m.__path__:
-                print("P", end=" ")
-            else:
-                print("m", end=" ")
-            print(f"{key:25} {m.__file__ or ''}")
+        for key in sorted(modules):
+            m = modules[key]
+            out.append(f"{'P' if m.__path__ else 'm'} {key:25} {m.__file__ or ''}")
+
+        bad_get = self.badmodules.__getitem__
 
         # Print missing modules
         missing, maybe = self.any_missing_maybe()
         if missing:
-            print()
-            print("Missing modules:")
-            for name in missing:
-                mods = sorted(self.badmodules[name])
-                print("?", name, "imported from", ", ".join(mods))
+            out.append("")
+            out.append("Missing modules:")
+            out.extend(f"? {name} imported from {', '.join(sorted(bad_get(name)))}" for name in missing)
         # Print modules that may be missing, but then again, maybe not...
         if maybe:
-            print()
-            print("Submodules that appear to be missing, but could also be", end=" ")
-            print("global names in the parent package:")
-            for name in maybe:
-                mods = sorted(self.badmodules[name])
-                print("?", name, "imported from", ", ".join(mods))
+            out.append("")
+            out.append("Submodules that appear to be missing, but could also be global names in the parent package:")
+            out.extend(f"? {name} imported from {', '.join(sorted(bad_get(name)))}" for name in maybe)
+
+        sys.stdout.write("\n".join(out) + "\n")
 
     def any_missing(self) -> list[str]:
         """Return a list of modules that appear to be missing. Use
@@ -544,8 +713,10 @@ class ModuleFinder:
         """
         missing: list[str] = []
         maybe: list[str] = []
+        # Built here rather than kept around, so that later changes to self.excludes are still honored.
+        excludes = frozenset(self.excludes)
         for name in self.badmodules:
-            if name in self.excludes:
+            if name in excludes:
                 continue
             i = name.rfind(".")
             if i < 0:
@@ -579,12 +750,27 @@ class ModuleFinder:
         maybe.sort()
         return missing, maybe
 
+    def _replaced_filename(self, original_filename: str) -> str:
+        """Return the (normalized) filename with the first matching prefix in self.replace_paths replaced."""
+
+        try:
+            return self._replaced_filenames[original_filename]
+        except KeyError:
+            pass
+
+        new_filename = original_filename
+        # Let str.startswith() reject filenames that match none of the prefixes before looking for the one that matched.
+        if original_filename.startswith(self._replace_prefixes):
+            for f, r in self.replace_paths:
+                if original_filename.startswith(f):
+                    new_filename = r + original_filename.removeprefix(f)
+                    break
+        self._replaced_filenames[original_filename] = new_filename
+        return new_filename
+
     def replace_paths_in_code(self, co: types.CodeType) -> types.CodeType:
-        new_filename = original_filename = os.path.normpath(co.co_filename)
-        for f, r in self.replace_paths:
-            if original_filename.startswith(f):
-                new_filename = r + original_filename.removeprefix(f)
-                break
+        original_filename = _normpath(co.co_filename)
+        new_filename = self._replaced_filename(original_filename)
 
         if self.debug and (original_filename not in self.processed_paths):
             if new_filename != original_filename:
@@ -593,12 +779,21 @@ class ModuleFinder:
                 self.msgout(2, f"co_filename {original_filename!r} remains unchanged")
             self.processed_paths.append(original_filename)
 
-        consts = list(co.co_consts)
-        for i, const in enumerate(consts):
+        # Only copy the constants if a nested code object actually changed.
+        consts: list[object] | None = None
+        for i, const in enumerate(co.co_consts):
             if isinstance(const, types.CodeType):
-                consts[i] = self.replace_paths_in_code(const)
+                new_const = self.replace_paths_in_code(const)
+                if new_const is not const:
+                    if consts is None:
+                        consts = list(co.co_consts)
+                    consts[i] = new_const
 
-        return co.replace(co_consts=tuple(consts), co_filename=new_filename)
+        if consts is not None:
+            return co.replace(co_consts=tuple(consts), co_filename=new_filename)
+        if new_filename != co.co_filename:
+            return co.replace(co_filename=new_filename)
+        return co
 
 
 def main() -> int:
@@ -612,20 +807,25 @@ def main() -> int:
     parser.add_argument("scripts", nargs="*", default=["hello.py"])
 
     class Namespace(argparse.Namespace):
-        debug: int
-        modules_to_do: list[str]
-        addpath: list[str]
-        exclude: list[str]
+        debug: int | None
+        modules_to_do: list[str] | None
+        addpath: list[str] | None
+        exclude: list[str] | None
         scripts: list[str]
 
     args = parser.parse_args(namespace=Namespace())
 
     # Set the path based on sys.path and the script directory
     script = args.scripts[0]
-    path = (
-        [subpath for path in args.addpath for subpath in path.split(os.pathsep)]
-        + [os.path.dirname(script)]
-        + sys.path[1:]
+    # Drop repeated entries (keeping the first), so the same directory isn't searched and indexed twice.
+    path = list(
+        dict.fromkeys(
+            itertools.chain(
+                itertools.chain.from_iterable(addpath.split(os.pathsep) for addpath in (args.addpath or ())),
+                [os.path.dirname(script)],
+                sys.path[1:],
+            )
+        )
     )
     if args.debug:
         print("path:")
@@ -633,9 +833,10 @@ def main() -> int:
             print(f"    {item}")
 
     # Create the module finder and turn its crank
-    mf = ModuleFinder(path, args.debug, args.exclude)
+    # Options that weren't given at all come out of argparse as None.
+    mf = ModuleFinder(path, args.debug or 0, args.exclude)
 
-    for mod in args.modules_to_do:
+    for mod in args.modules_to_do or ():
         if mod.endswith(".*"):
             mf.import_hook(mod.removesuffix(".*"), None, ["*"])
         else:
@@ -3,6 +3,7 @@ from __future__ import annotations
 import collections.abc as _cabc
 import contextlib
 import dis
+import functools
 import importlib.util
 import os
 import sys
@@ -21,11 +22,10 @@ if TYPE_CHECKING:
 
     from _typeshed.importlib import MetaPathFinderProtocol as _MetaPathFinderProtocol
 
-    _OpcodeInfo: _t.TypeAlias = (
-        tuple[_t.Literal["store"], tuple[str]] | tuple[_t.Literal["import"], tuple[str, list[str] | None, int]]
-    )
+    # An import's name, fromlist and level.
+    _ImportInfo: _t.TypeAlias = tuple[str, tuple[str, ...] | None, int]
 else:
-    _MetaPathFinderProtocol = _OpcodeInfo = object
+    _MetaPathFinderProtocol = _ImportInfo = object
 
 
 # Used for a parameter annotation.
@@ -33,116 +33,231 @@ if TYPE_CHECKING:
     import importlib.abc  # noqa: TC004
 
 
-# Used to tell type-checkers that dis has these private functions with specific signatures.
-if TYPE_CHECKING:
-    import typing as _t
+_StrPath = str | os.PathLike[str]
 
-    @_t.runtime_checkable
-    class _DisModule(_t.Protocol):
-        def _find_store_names(self, co: types.CodeType) -> _cabc.Generator[str]: ...
-        def _find_imports(self, co: types.CodeType) -> _cabc.Generator[tuple[str, int, list[str] | None]]: ...
+# Shared by every module until it actually has names to record; most modules never do star-imports, and modules without
+# code never record anything.
+_NO_NAMES: frozenset[str] = frozenset()
 
-    assert isinstance(dis, _DisModule)
 
+_EXTENDED_ARG = dis.EXTENDED_ARG
+# Inline cache entries (3.11+) are zeroed out in co_code and aren't instructions.
+_CACHE = dis.opmap.get("CACHE", -1)
+_IMPORT_NAME = dis.opmap["IMPORT_NAME"]
+_STORE_OPS = frozenset((dis.opmap["STORE_NAME"], dis.opmap["STORE_GLOBAL"]))
+_HAS_CONST = frozenset(dis.hasconst)
+# 3.14+ loads small ints, e.g. an import's level, with LOAD_SMALL_INT, which carries the value as its argument.
+_LOAD_SMALL_INT = dis.opmap.get("LOAD_SMALL_INT", -1)
+_INTERESTING_OP_BYTES = tuple(bytes((op,)) for op in (_IMPORT_NAME, *_STORE_OPS))
 
-_StrPath = str | os.PathLike[str]
 
-_MISSING = object()
+def _normalize_path_prefix(prefix: str) -> str:
+    # os.path.normpath() drops a trailing separator, which would make "/a/b/" match "/a/bc" as well.
+    norm_prefix = os.path.normpath(prefix)
+    if prefix.endswith((os.sep, os.altsep or os.sep)) and not norm_prefix.endswith(os.sep):
+        norm_prefix += os.sep
+    return norm_prefix
+
 
+def _replaced_filename(filename: str, path_replacements: list[tuple[str, str]], old_paths: tuple[str, ...]) -> str:
+    """Normalize the filename, and replace the first of the path prefixes that it starts with.
 
-@contextlib.contextmanager
-def _patch_attr(obj: object, attr_name: str, new_value: object, /) -> _cabc.Generator[None]:
-    """Context manager for temporarily patching the attribute of an object."""
+    old_paths holds the prefixes of path_replacements, in the same order.
+    """
 
-    old_value = _MISSING
-    try:
-        old_value = getattr(obj, attr_name)
-        setattr(obj, attr_name, new_value)
-        yield
-    finally:
-        if old_value is not _MISSING:
-            setattr(obj, attr_name, old_value)
+    norm_filename = os.path.normpath(filename)
+
+    # str.startswith() can reject every prefix in one call, which is the common case.
+    if norm_filename.startswith(old_paths):
+        for old_path, new_path in path_replacements:
+            if norm_filename.startswith(old_path):
+                return norm_filename.replace(old_path, new_path, 1)
+
+    return norm_filename
 
 
 def _replace_paths_in_code(code: types.CodeType, path_replacements: list[tuple[str, str]]) -> types.CodeType:
-    original_filename = os.path.normpath(code.co_filename)
+    """Replace path prefixes in the filenames of the code and its nested code.
 
-    for old_path, new_path in path_replacements:
-        if original_filename.startswith(old_path):
-            new_filename = original_filename.replace(old_path, new_path, 1)
-            break
-    else:
-        new_filename = original_filename
+    The replacements are expected to be normalized already and sorted so that longer prefixes come first.
+    """
 
-    new_consts = list(code.co_consts)
-    for i, const in enumerate(new_consts):
-        if isinstance(const, types.CodeType):
-            new_consts[i] = _replace_paths_in_code(const, path_replacements)
+    if not path_replacements:
+        return code
+
+    old_paths = tuple(old_path for old_path, _ in path_replacements)
+    # Nested code objects nearly always share their parent's filename, so only work each distinct one out once.
+    new_filenames: dict[str, str] = {}
+
+    # Collect the code objects in the tree parents-first, then rebuild them children-first, so that every parent can
+    # pick up its already rebuilt children.
+    tree: list[types.CodeType] = []
+    stack = [code]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(const for const in current.co_consts if isinstance(const, types.CodeType))
+
+    # Everything in the tree stays alive until we're done, so ids are safe to use as keys.
+    replaced: dict[int, types.CodeType] = {}
+    for current in reversed(tree):
+        try:
+            new_filename = new_filenames[current.co_filename]
+        except KeyError:
+            new_filename = new_filenames[current.co_filename] = _replaced_filename(
+                current.co_filename, path_replacements, old_paths
+            )
+
+        # Only copy the constants once a nested code object actually changed, and leave unaffected code as-is.
+        new_consts: list[object] | None = None
+        for i, const in enumerate(current.co_consts):
+            if isinstance(const, types.CodeType) and (new_const := replaced[id(const)]) is not const:
+                if new_consts is None:
+                    new_consts = list(current.co_consts)
+                new_consts[i] = new_const
+
+        if new_consts is not None:
+            replaced[id(current)] = current.replace(co_consts=tuple(new_consts), co_filename=new_filename)
+        elif new_filename != current.co_filename:
+            replaced[id(current)] = current.replace(co_filename=new_filename)
+        else:
+            replaced[id(current)] = current
 
-    return code.replace(co_consts=tuple(new_consts), co_filename=new_filename)
+    return replaced[id(code)]
 
 
-def _scan_opcodes(code: types.CodeType) -> _cabc.Generator[_OpcodeInfo]:
-    """Scan the code, and yield 'interesting' opcode combinations."""
+@functools.lru_cache(maxsize=8192)
+def _scan_opcodes(code: types.CodeType) -> tuple[tuple[str, ...], tuple[_ImportInfo, ...]]:
+    """Scan the code, and return the names it stores to and the imports it does.
 
-    # These private dis functions exist specifically for modulefinder's use.
-    for name in dis._find_store_names(code):  # pyright: ignore [reportPrivateUsage]
-        yield ("store", (name,))
-    for name, level, fromlist in dis._find_imports(code):  # pyright: ignore [reportPrivateUsage]
-        yield ("import", (name, fromlist, level))
+    Code objects are immutable, so the result is cached; the same code is often scanned again, e.g. by another
+    ModuleFinder.
+    """
 
+    # This does the work of dis._find_store_names() and dis._find_imports() in a single pass over the bytecode, reading
+    # the (opcode, argument) byte pairs straight out of co_code.
+    names = code.co_names
+    co_code = code.co_code
+
+    # All the interesting opcodes take an index into co_names, so code without names can't have any. Otherwise, looking
+    # for their bytes is a C-speed check that lets most nested functions skip the walk entirely (a match in an argument
+    # byte just means a full scan happens anyway). Only those opcodes are looked for, not the loads in front of an
+    # import, so how a version loads an import's level is left to the walk below.
+    if not names or not any(op_byte in co_code for op_byte in _INTERESTING_OP_BYTES):
+        return (), ()
+
+    consts = code.co_consts
+    store_names: list[str] = []
+    imports: list[_ImportInfo] = []
+    extended_arg = 0
+
+    # An IMPORT_NAME is preceded by the loads of its level and fromlist. -1 is never a real opcode.
+    level_op = from_op = -1
+    level_arg = from_arg = 0
+    for op, op_arg in zip(co_code[::2], co_code[1::2], strict=True):
+        if op == _EXTENDED_ARG:
+            extended_arg = (extended_arg | op_arg) << 8
+            continue
+        if op == _CACHE:
+            continue
+        arg = op_arg | extended_arg
+        extended_arg = 0
+
+        if op in _STORE_OPS:
+            store_names.append(names[arg])
+        elif op == _IMPORT_NAME and from_op in _HAS_CONST:
+            if level_op in _HAS_CONST:
+                imports.append((names[arg], consts[from_arg], consts[level_arg]))
+            elif level_op == _LOAD_SMALL_INT:
+                imports.append((names[arg], consts[from_arg], level_arg))
+
+        level_op, level_arg, from_op, from_arg = from_op, from_arg, op, arg
+
+    return tuple(store_names), tuple(imports)
+
+
+def _add_bad_module(mf: ModuleFinder, name: str, importer: str) -> None:
+    # Only the first importer of a name needs a new set; setdefault() would build a throwaway one every time.
+    if (importers := mf.bad_modules.get(name)) is None:
+        mf.bad_modules[name] = {importer}
+    else:
+        importers.add(importer)
+
+
+def _scan_import(  # noqa: PLR0913, PLR0917
+    mf: ModuleFinder,
+    module: MFModuleType,
+    package: str | None,
+    name: str,
+    fromlist: tuple[str, ...] | None,
+    level: int,
+) -> None:
+    if fromlist is None:
+        have_star = False
+        fromlist = ()
+    else:
+        # Only build a new fromlist in the rare case that it has to change.
+        have_star = "*" in fromlist
+        if have_star:
+            fromlist = tuple(f for f in fromlist if f != "*")
+
+    # The package only matters for relative imports; leaving it out otherwise lets more import sites share an entry.
+    name, result_module = mf._cached_import(package if (level > 0) else None, name, fromlist, level)  # pyright: ignore [reportPrivateUsage]
+
+    if result_module is None:
+        _add_bad_module(mf, name, module.__name__)
+    elif hasattr(result_module, "__path__"):
+        for from_item in fromlist:
+            if not hasattr(result_module, from_item):
+                _add_bad_module(mf, f"{name}.{from_item}", module.__name__)
+
+    if have_star:
+        # We've encountered an "import *". If it is a Python module,
+        # the code has already been parsed and we can suck out the
+        # global names.
+        star_imports = module.__mf_star_imports__
+        if isinstance(star_imports, frozenset):
+            # Still the shared _NO_NAMES, so give the module a set of its own.
+            star_imports = module.__mf_star_imports__ = set()
+
+        if (cached_mod := sys.modules.get(name)) is not None:
+            assert isinstance(cached_mod, MFModuleType)
+            global_names = module.__mf_global_names__
+            # The module is being scanned, so it has code and its own set of global names.
+            assert isinstance(global_names, set)
+            global_names |= cached_mod.__mf_global_names__
+            star_imports |= cached_mod.__mf_star_imports__
+            if cached_mod.__code__ is None:
+                star_imports.add(name)
+        else:
+            star_imports.add(name)
 
-def _scan_code(mf: ModuleFinder, module: MFModuleType, code: types.CodeType) -> None:  # noqa: PLR0912
-    for opcode_info in _scan_opcodes(code):
-        match opcode_info:
-            case ("store", (name,)):
-                module.__mf_global_names__.add(name)
 
-            case ("import", (name, fromlist, level)):
-                if fromlist is not None:
-                    have_star = "*" in fromlist
-                    fromlist = [f for f in fromlist if f != "*"]
-                else:
-                    have_star = False
-                    fromlist = []
-
-                try:
-                    if level > 0:
-                        package: str | None = _calc___package__(module.__dict__)  # pyright: ignore[reportUnknownVariableType]
-                        assert isinstance(package, str) or (package is None)
-                        name = importlib.util.resolve_name("." * level + name, package)
-                        level = 0
-
-                    # NOTE: We use importlib.__import__ to avoid special-casing of builtin modules like sys.
-                    result_module = importlib.__import__(name, module.__dict__, module.__dict__, fromlist, level)
-                except (ImportError, SyntaxError):
-                    mf.bad_modules.setdefault(name, set()).add(module.__name__)
-                else:
-                    if hasattr(result_module, "__path__"):
-                        for from_item in fromlist:
-                            if not hasattr(result_module, from_item):
-                                mf.bad_modules.setdefault(f"{name}.{from_item}", set()).add(module.__name__)
-
-                if have_star:
-                    # We've encountered an "import *". If it is a Python module,
-                    # the code has already been parsed and we can suck out the
-                    # global names.
-                    if (cached_mod := sys.modules.get(name)) is not None:
-                        assert isinstance(cached_mod, MFModuleType)
-                        module.__mf_global_names__ |= cached_mod.__mf_global_names__
-                        module.__mf_star_imports__ |= cached_mod.__mf_star_imports__
-                        if cached_mod.__code__ is None:
-                            module.__mf_star_imports__.add(name)
-                    else:
-                        module.__mf_star_imports__.add(name)
-
-            case unknown:  # pyright: ignore [reportUnnecessaryComparison] # Get a good error message.
-                msg = f"Unknown opcode info: {unknown!r}"
-                raise RuntimeError(msg)
-
-    for const in code.co_consts:
-        if isinstance(const, types.CodeType):
-            _scan_code(mf, module, const)
+def _scan_code(mf: ModuleFinder, module: MFModuleType, code: types.CodeType) -> None:
+    # The module's code isn't executed, so its package can't change while it's scanned. Only relative imports need it,
+    # though, and working it out can warn, so that's left until the first one.
+    package: str | None = None
+    have_package = False
+
+    # Modules with code get their own set of global names before they're scanned.
+    global_names = module.__mf_global_names__
+    assert isinstance(global_names, set)
+
+    # Walk the nested code objects with a worklist instead of recursing, in the same (pre-)order.
+    stack = [code]
+    while stack:
+        current = stack.pop()
+        store_names, imports = _scan_opcodes(current)
+
+        global_names.update(store_names)
+        for name, fromlist, level in imports:
+            if level > 0 and not have_package:
+                package = _calc___package__(module.__dict__)  # pyright: ignore[reportUnknownVariableType]
+                assert isinstance(package, str) or (package is None)
+                have_package = True
+            _scan_import(mf, module, package, name, fromlist, level)
+
+        stack.extend(reversed([const for const in current.co_consts if isinstance(const, types.CodeType)]))
 
 
 def _inject_mf_into_spec(spec: ModuleSpec, mf: ModuleFinder) -> ModuleSpec:
@@ -159,16 +274,22 @@ class MFModuleType(types.ModuleType):
     ----------
     __code__: types.CodeType | None
         The unexecuted module code.
-    global_names: set[str]
+    __mf_global_names__: set[str] | frozenset[str]
         The set of global names that are assigned to within the module. This includes those names imported through
         star-imports of Python modules.
-    star_imports: set[str]
+    __mf_star_imports__: set[str] | frozenset[str]
         The set of star-imports this module did that could not be resolved, ie. a star-import from a non-Python module.
+
+    Until something is recorded in them, these are one empty frozenset shared by all modules, so don't add to them
+    directly; copy them into a set of your own instead.
     """
 
+    # Kept out of the module's __dict__: slot access is cheaper, and these aren't names the module's code defines.
+    __slots__ = ("__code__", "__mf_global_names__", "__mf_star_imports__")
+
     __code__: types.CodeType | None
-    __mf_global_names__: set[str]
-    __mf_star_imports__: set[str]
+    __mf_global_names__: set[str] | frozenset[str]
+    __mf_star_imports__: set[str] | frozenset[str]
 
 
 class _MFLoader:
@@ -183,17 +304,18 @@ class _MFLoader:
 
         # Initialize mf-specific module attributes with default values.
         module.__code__ = None
-        module.__mf_global_names__ = set()
-        module.__mf_star_imports__ = set()
+        module.__mf_global_names__ = module.__mf_star_imports__ = _NO_NAMES
 
         if (code := self.loader.get_code(module.__name__)) is not None:
+            module.__mf_global_names__ = set()
+
             spec = module.__spec__
             assert spec is not None
             mf: ModuleFinder = spec.loader_state["mf"]
             spec.loader_state = None
 
-            if mf.path_replacements:
-                code = _replace_paths_in_code(code, mf.path_replacements)
+            if mf._norm_replacements:  # pyright: ignore [reportPrivateUsage]
+                code = _replace_paths_in_code(code, mf._norm_replacements)  # pyright: ignore [reportPrivateUsage]
             module.__code__ = code
 
             _scan_code(mf, module, code)
@@ -245,11 +367,34 @@ class ModuleFinder:
         path: _cabc.Sequence[_StrPath] | None = None,
         path_replacements: _cabc.Sequence[tuple[_StrPath, _StrPath]] | None = None,
         excludes: _cabc.Sequence[str] | None = None,
+        import_cache_size: int | None = 4096,
     ) -> None:
+        """Initialize the finder.
+
+        Parameters
+        ----------
+        path: Sequence[_StrPath] | None, optional
+            The paths to search for modules. Defaults to `sys.path`.
+        path_replacements: Sequence[tuple[_StrPath, _StrPath]] | None, optional
+            (oldpath, newpath) prefix pairs that will be replaced in the filenames of the found modules' code.
+        excludes: Sequence[str] | None, optional
+            The names of modules to leave out of the missing modules.
+        import_cache_size: int | None, default=4096
+            How many import outcomes to keep during a run, so that the same import done in many places is only
+            resolved once. The cache is emptied at the start of every run. None means no limit, and 0 turns the
+            cache off.
+        """
+
         if path_replacements is not None:
             self.path_replacements = [(os.fspath(old), os.fspath(new)) for old, new in path_replacements]
         else:
             self.path_replacements = []
+        # Normalized once up front, with longer prefixes first so that the most specific replacement wins.
+        self._norm_replacements = sorted(
+            ((_normalize_path_prefix(old_path), new_path) for old_path, new_path in self.path_replacements),
+            key=lambda pair: len(pair[0]),
+            reverse=True,
+        )
         self.excludes: list[str] = list(excludes) if (excludes is not None) else []  # TODO
 
         self.path: list[str] = [os.fspath(p) for p in path] if (path is not None) else sys.path
@@ -262,30 +407,85 @@ class ModuleFinder:
 
         self.bad_modules: dict[str, set[str]] = {}
 
+        # The same imports show up over and over across modules. Within a run, sys.modules is ours, so the outcome of
+        # an import doesn't change and can be reused for every later import site. Between runs, self.path may change
+        # and import_as_file() may add modules, so every run starts with an empty cache (see _patch_sys()). The cache
+        # is bounded so that very large scans don't keep every distinct import site around.
+        self._cached_import = functools.lru_cache(maxsize=import_cache_size)(self._import_for_scan)
+
+    def _import_for_scan(
+        self,
+        package: str | None,
+        name: str,
+        fromlist: tuple[str, ...],
+        level: int,
+    ) -> tuple[str, types.ModuleType | None]:
+        """Do an import found while scanning, and return the resolved name and the module, or None if it failed."""
+
+        try:
+            if level > 0:
+                name = importlib.util.resolve_name("." * level + name, package)
+
+            # NOTE: We use importlib.__import__ to avoid special-casing of builtin modules like sys.
+            # The name is absolute at this point, so no globals are needed to resolve it.
+            module = importlib.__import__(name, None, None, fromlist, 0)
+        except (ImportError, SyntaxError):
+            return name, None
+        else:
+            return name, module
+
     @contextlib.contextmanager
     def _patch_sys(self) -> _cabc.Generator[None]:
-        with (
-            self.__sys_patch_lock,
-            _patch_attr(sys, "modules", self.modules),
-            _patch_attr(sys, "path", self.path),
-            _patch_attr(sys, "meta_path", self.meta_path),
-            _patch_attr(sys, "path_hooks", list(sys.path_hooks)),
-            _patch_attr(sys, "path_importer_cache", dict(sys.path_importer_cache)),
-        ):
-            yield
+        with self.__sys_patch_lock:
+            # Outcomes cached by an earlier run may be stale by now, e.g. failures for modules that have been found
+            # since.
+            self._cached_import.cache_clear()
+
+            new_values = {
+                "modules": self.modules,
+                "path": self.path,
+                "meta_path": self.meta_path,
+                "path_hooks": list(sys.path_hooks),
+                "path_importer_cache": dict(sys.path_importer_cache),
+            }
+            # Swap everything in one frame instead of stacking a context manager per attribute. Attributes that are
+            # already right, e.g. sys.path for a finder that uses the default path, are left alone.
+            old_values = {
+                attr_name: old_value
+                for attr_name, new_value in new_values.items()
+                if (old_value := getattr(sys, attr_name)) is not new_value
+            }
+            try:
+                for attr_name in old_values:
+                    setattr(sys, attr_name, new_values[attr_name])
+                yield
+            finally:
+                for attr_name, old_value in old_values.items():
+                    setattr(sys, attr_name, old_value)
 
     def _import_from_file(self, name: str, pathname: _StrPath) -> None:
         with self._patch_sys():
             spec = importlib.util.spec_from_file_location(name, pathname)
             if spec is None:
                 raise FileNotFoundError(pathname)
+
+            # The file may have already been scanned under this name, e.g. as a dependency of something else. Its
+            # results can't have changed since, so keep them instead of scanning it again.
+            existing = sys.modules.get(name)
+            if (
+                isinstance(existing, MFModuleType)
+                and (existing_spec := existing.__spec__) is not None
+                and existing_spec.origin == spec.origin
+            ):
+                return
+
             spec = _inject_mf_into_spec(spec, self)
             assert spec.loader is not None
             module = importlib.util.module_from_spec(spec)
             assert isinstance(module, MFModuleType)
-            assert module.__code__ is not None
             sys.modules[name] = module
             spec.loader.exec_module(module)
+            assert module.__code__ is not None
 
     def import_as_module(
         self,
@@ -321,8 +521,12 @@ class ModuleFinder:
         missing: list[str] = []
         maybe: list[str] = []
 
-        for name in self.bad_modules:
-            if name in self.excludes:
+        # Built here rather than kept around, so that later changes to self.excludes are still honored.
+        excludes = frozenset(self.excludes)
+        modules_get = self.modules.get
+
+        for name, importers in self.bad_modules.items():
+            if name in excludes:
                 continue
 
             if "." not in name:
@@ -330,10 +534,10 @@ class ModuleFinder:
                 continue
 
             pkgname, _, subname = name.rpartition(".")
-            pkg = self.modules.get(pkgname)
+            pkg = modules_get(pkgname)
 
             if pkg is not None:
-                if pkgname in self.bad_modules[name]:
+                if pkgname in importers:
                     # The package tried to import this module itself and
                     # failed. It's definitely missing.
                     missing.append(name)
@@ -364,32 +568,30 @@ class ModuleFinder:
         The report lists the found modules with their paths, as well as modules that are missing or seem to be missing.
         """
 
-        print()
-        print(f"  {'Name':25} File")
-        print(f"  {'----':25} ----")
+        # Build the whole report first and write it out in one go.
+        modules = self.modules
+        out = ["", f"  {'Name':25} File", f"  {'----':25} ----"]
 
         # Print modules found
-        keys = sorted(self.modules)
-        for key in keys:
-            m = self.modules[key]
-            pkg_or_module = "P" if m.__path__ else "m"
-            print(pkg_or_module, key.ljust(25), m.__file__ or "")
+        # Only packages have __path__, and modules without a location (e.g. built-ins) have no __file__.
+        for key in sorted(modules):
+            m = modules[key]
+            pkg_or_module = "P" if getattr(m, "__path__", None) else "m"
+            out.append(f"{pkg_or_module} {key:<25} {getattr(m, '__file__', None) or ''}")
 
         missing, maybe = self.any_missing_maybe()
-
-        def print_mods(mods: list[str]) -> None:
-            for name in mods:
-                mods = sorted(self.bad_modules[name])
-                print("?", name, "imported from", ", ".join(mods))
+        bad_modules = self.bad_modules
 
         # Print missing modules
         if missing:
-            print()
-            print("Missing modules:")
-            print_mods(missing)
+            out.append("")
+            out.append("Missing modules:")
+            out.extend(f"? {name} imported from {', '.join(sorted(bad_modules[name]))}" for name in missing)
 
         # Print modules that may be missing, but then again, maybe not...
         if maybe:
-            print()
-            print("Submodules that appear to be missing, but could also be global names in the parent package:")
-            print_mods(maybe)
+            out.append("")
+            out.append("Submodules that appear to be missing, but could also be global names in the parent package:")
+            out.extend(f"? {name} imported from {', '.join(sorted(bad_modules[name]))}" for name in maybe)
+
+        sys.stdout.write("\n".join(out) + "\n")
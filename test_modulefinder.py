@@ -1,8 +1,10 @@
 import collections.abc as _cabc
+import dis
 import importlib.machinery
 import os
 import py_compile
 import sysconfig
+import types
 from pathlib import Path
 from textwrap import dedent
 
@@ -11,31 +13,56 @@ import pytest
 import modulefinder_revamped as modulefinder
 
 
-NestedMapping = _cabc.Mapping[str, "NestedMapping | str | bytes"]
+NestedMapping = _cabc.Mapping[str, "NestedMapping | bytes"]
 
 
 STDLIB_PATH = sysconfig.get_path("stdlib")
+SOURCE_SUFFIX = importlib.machinery.SOURCE_SUFFIXES[0]
+BYTECODE_SUFFIX = importlib.machinery.BYTECODE_SUFFIXES[0]
 
 
-def create_file_tree(path: Path, dir_contents: NestedMapping) -> None:
+def source_bytes(text: str) -> bytes:
+    """Dedent and encode source code for a test file tree, once, when the test module is collected."""
+
+    return dedent(text).encode("utf-8")
+
+
+def create_file_tree(path: str, dir_contents: NestedMapping) -> None:
     """Create a tree of files based on a (nested) dict of file/directory names and (source) contents.
 
     Warning: Be careful when using escape sequences in file contents strings. Consider escaping them or using raw
     strings.
     """
 
-    for filename, value in dir_contents.items():
-        filepath = path / filename
-        if isinstance(value, dict):
-            filepath.mkdir()
-            create_file_tree(filepath, value)
-        elif isinstance(value, str):
-            filepath.write_text(value, encoding="utf-8")
-        elif isinstance(value, bytes):
-            filepath.write_bytes(value)
-        else:  # pragma: no cover
-            msg = f"Expected a dict, string, or bytes object, got {value!r}."
-            raise TypeError(msg)
+    # Plain strings and os functions are enough here; there's no need for a Path object per node.
+    stack = [(path, dir_contents)]
+    while stack:
+        dir_path, contents = stack.pop()
+        for filename, value in contents.items():
+            filepath = os.path.join(dir_path, filename)
+            if isinstance(value, dict):
+                os.mkdir(filepath)
+                stack.append((filepath, value))
+            elif isinstance(value, bytes):
+                write_file(filepath, value)
+            else:  # pragma: no cover
+                msg = f"Expected a dict or bytes object, got {value!r}."
+                raise TypeError(msg)
+
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def write_file(filepath: str | os.PathLike[str], data: bytes) -> None:
+    """Write bytes to a file with plain os calls, skipping the buffered file object that open() would set up."""
+
+    fd = os.open(filepath, _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
 
 
 def run_module_finder(  # noqa: PLR0913
@@ -50,7 +77,7 @@ def run_module_finder(  # noqa: PLR0913
     mf.import_as_module(import_this)
 
     # Check if we found what we expected, not more, not less.
-    assert set(mf.modules) == expected_modules
+    assert mf.modules.keys() == expected_modules
 
     # Check for missing and maybe missing modules.
     missing, maybe_missing = mf.any_missing_maybe()
@@ -77,20 +104,20 @@ def run_module_finder(  # noqa: PLR0913
     [
         pytest.param(
             {
-                "mymodule.py": "",
+                "mymodule.py": b"",
                 "a": {
-                    "__init__.py": dedent("""\
+                    "__init__.py": source_bytes("""\
                         import blahblah
                         from a import b
                         import c
                     """),
-                    "module.py": dedent("""\
+                    "module.py": source_bytes("""\
                         import sys
                         from a import b as x
                         from a.c import sillyname
                     """),
-                    "b.py": "",
-                    "c.py": dedent("""\
+                    "b.py": b"",
+                    "c.py": source_bytes("""\
                         from a.module import x
                         import mymodule as sillyname
                         from sys import version_info
@@ -106,14 +133,14 @@ def run_module_finder(  # noqa: PLR0913
         pytest.param(
             {
                 "a": {
-                    "__init__.py": "",
-                    "module.py": dedent("""\
+                    "__init__.py": b"",
+                    "module.py": source_bytes("""\
                         from b import something
                         from c import something
                     """),
                 },
                 "b": {
-                    "__init__.py": dedent("""\
+                    "__init__.py": source_bytes("""\
                         from sys import *
                     """)
                 },
@@ -127,14 +154,14 @@ def run_module_finder(  # noqa: PLR0913
         pytest.param(
             {
                 "a": {
-                    "__init__.py": "",
-                    "module.py": dedent("""\
+                    "__init__.py": b"",
+                    "module.py": source_bytes("""\
                         from b import something
                         from c import something
                     """),
                 },
                 "b": {
-                    "__init__.py": dedent("""\
+                    "__init__.py": source_bytes("""\
                         from __future__ import absolute_import
                         from sys import *
                     """)
@@ -148,10 +175,10 @@ def run_module_finder(  # noqa: PLR0913
         ),
         pytest.param(
             {
-                "mymodule.py": "",
+                "mymodule.py": b"",
                 "a": {
-                    "__init__.py": "",
-                    "module.py": dedent("""\
+                    "__init__.py": b"",
+                    "module.py": source_bytes("""\
                         from __future__ import absolute_import
                         import sys # sys
                         import blahblah # fails
@@ -160,21 +187,21 @@ def run_module_finder(  # noqa: PLR0913
                         from b import y # b.y
                         from b.z import * # b.z.*
                     """),
-                    "gc.py": "",
-                    "sys.py": "import mymodule",
+                    "gc.py": b"",
+                    "sys.py": b"import mymodule",
                     "b": {
-                        "__init__.py": "",
-                        "x.py": "",
-                        "y.py": "",
-                        "z.py": "",
+                        "__init__.py": b"",
+                        "x.py": b"",
+                        "y.py": b"",
+                        "z.py": b"",
                     },
                 },
                 "b": {
-                    "__init__.py": "import z",
-                    "unused.py": "",
-                    "x.py": "",
-                    "y.py": "",
-                    "z.py": "",
+                    "__init__.py": b"import z",
+                    "unused.py": b"",
+                    "x.py": b"",
+                    "y.py": b"",
+                    "z.py": b"",
                 },
             },
             "a.module",
@@ -185,31 +212,31 @@ def run_module_finder(  # noqa: PLR0913
         ),
         pytest.param(
             {
-                "mymodule.py": "",
+                "mymodule.py": b"",
                 "a": {
-                    "__init__.py": "from .b import y, z # a.b.y, a.b.z",
-                    "module.py": dedent("""\
+                    "__init__.py": b"from .b import y, z # a.b.y, a.b.z",
+                    "module.py": source_bytes("""\
                         from __future__ import absolute_import # __future__
                         import gc # gc
                     """),
-                    "gc.py": "",
-                    "sys.py": "",
+                    "gc.py": b"",
+                    "sys.py": b"",
                     "b": {
-                        "__init__.py": dedent("""\
+                        "__init__.py": source_bytes("""\
                             from ..b import x # a.b.x
                             #from a.b.c import moduleC
                             from .c import moduleC # a.b.moduleC
                         """),
-                        "x.py": "",
-                        "y.py": "",
-                        "z.py": "",
-                        "g.py": "",
+                        "x.py": b"",
+                        "y.py": b"",
+                        "z.py": b"",
+                        "g.py": b"",
                         "c": {
-                            "__init__.py": "from ..c import e # a.b.c.e",
-                            "moduleC.py": "from ..c import d # a.b.c.d",
-                            "d.py": "",
-                            "e.py": "",
-                            "x.py": "",
+                            "__init__.py": b"from ..c import e # a.b.c.e",
+                            "moduleC.py": b"from ..c import d # a.b.c.d",
+                            "d.py": b"",
+                            "e.py": b"",
+                            "x.py": b"",
                         },
                     },
                 },
@@ -235,32 +262,32 @@ def run_module_finder(  # noqa: PLR0913
         ),
         pytest.param(
             {
-                "mymodule.py": "",
+                "mymodule.py": b"",
                 "a": {
-                    "__init__.py": "from . import sys # a.sys",
-                    "another.py": "",
-                    "module.py": "from .b import y, z # a.b.y, a.b.z",
-                    "gc.py": "",
-                    "sys.py": "",
+                    "__init__.py": b"from . import sys # a.sys",
+                    "another.py": b"",
+                    "module.py": b"from .b import y, z # a.b.y, a.b.z",
+                    "gc.py": b"",
+                    "sys.py": b"",
                     "b": {
-                        "__init__.py": dedent("""\
+                        "__init__.py": source_bytes("""\
                             from .c import moduleC # a.b.c.moduleC
                             from .c import d # a.b.c.d
                         """),
-                        "x.py": "",
-                        "y.py": "",
-                        "z.py": "",
+                        "x.py": b"",
+                        "y.py": b"",
+                        "z.py": b"",
                         "c": {
-                            "__init__.py": "from . import e # a.b.c.e",
-                            "moduleC.py": dedent("""\
+                            "__init__.py": b"from . import e # a.b.c.e",
+                            "moduleC.py": source_bytes("""\
                                 #
                                 from . import f   # a.b.c.f
                                 from .. import x  # a.b.x
                                 from ... import another # a.another
                             """),
-                            "d.py": "",
-                            "e.py": "",
-                            "f.py": "",
+                            "d.py": b"",
+                            "e.py": b"",
+                            "f.py": b"",
                         },
                     },
                 },
@@ -288,8 +315,8 @@ def run_module_finder(  # noqa: PLR0913
         pytest.param(
             {
                 "a": {
-                    "__init__.py": "def foo(): pass",
-                    "module.py": dedent("""\
+                    "__init__.py": b"def foo(): pass",
+                    "module.py": source_bytes("""\
                         from . import foo
                         from . import bar
                     """),
@@ -304,8 +331,8 @@ def run_module_finder(  # noqa: PLR0913
         pytest.param(
             {
                 "a": {
-                    "__init__.py": "def foo(): pass",
-                    "module.py": "from . import *",
+                    "__init__.py": b"def foo(): pass",
+                    "module.py": b"from . import *",
                 }
             },
             "a.module",
@@ -317,12 +344,12 @@ def run_module_finder(  # noqa: PLR0913
         pytest.param(
             {
                 "a": {
-                    "__init__.py": "",
-                    "module.py": "import b.module",
+                    "__init__.py": b"",
+                    "module.py": b"import b.module",
                 },
                 "b": {
-                    "__init__.py": "",
-                    "module.py": "?  # SyntaxError: invalid syntax",
+                    "__init__.py": b"",
+                    "module.py": b"?  # SyntaxError: invalid syntax",
                 },
             },
             "a.module",
@@ -334,15 +361,15 @@ def run_module_finder(  # noqa: PLR0913
         pytest.param(
             {
                 "a": {
-                    "__init__.py": "",
-                    "module.py": dedent("""\
+                    "__init__.py": b"",
+                    "module.py": source_bytes("""\
                         import c
                         from b import c
                     """),
                 },
                 "b": {
-                    "__init__.py": "",
-                    "c.py": "",
+                    "__init__.py": b"",
+                    "c.py": b"",
                 },
             },
             "a.module",
@@ -354,11 +381,9 @@ def run_module_finder(  # noqa: PLR0913
         pytest.param(
             # 2**16 constants
             {
-                "a.py": dedent(f"""\
-                    {list(range(2**16))!r}
-                    import b
-                """),
-                "b.py": "",
+                # Same source as the repr of list(range(2**16)), without building the list or dedenting ~450KB.
+                "a.py": f"[{', '.join(map(str, range(2**16)))}]\nimport b\n".encode(),
+                "b.py": b"",
             },
             "a",
             {"a", "b"},
@@ -368,12 +393,12 @@ def run_module_finder(  # noqa: PLR0913
         ),
         pytest.param(
             {
-                "a_utf8.py": dedent("""\
+                "a_utf8.py": source_bytes("""\
                     # use the default of utf8
                     print('Unicode test A code point 2090 \u2090 that is not valid in cp1252')
                     import b_utf8
                 """),
-                "b_utf8.py": dedent("""\
+                "b_utf8.py": source_bytes("""\
                     # use the default of utf8
                     print('Unicode test B code point 2090 \u2090 that is not valid in cp1252')
                 """),
@@ -386,12 +411,12 @@ def run_module_finder(  # noqa: PLR0913
         ),
         pytest.param(
             {
-                "a_utf8.py": dedent("""\
+                "a_utf8.py": source_bytes("""\
                     # coding=utf8
                     print('Unicode test A code point 2090 \u2090 that is not valid in cp1252')
                     import b_utf8
                 """),
-                "b_utf8.py": dedent("""\
+                "b_utf8.py": source_bytes("""\
                     # use the default of utf8
                     print('Unicode test B code point 2090 \u2090 that is not valid in cp1252')
                 """),
@@ -412,7 +437,7 @@ def run_module_finder(  # noqa: PLR0913
                         b"import b_utf8",
                     )
                 ),
-                "b_utf8.py": dedent("""\
+                "b_utf8.py": source_bytes("""\
                     # use the default of utf8
                     print('Unicode test A code point 2090 \u2090 that is not valid in cp1252')
                 """),
@@ -423,6 +448,17 @@ def run_module_finder(  # noqa: PLR0913
             [],
             id="encoding-cp1252-explicit",
         ),
+        pytest.param(
+            {
+                "a.py": b"from pkg import __class__, __code__\n",
+                "pkg": {"__init__.py": b""},
+            },
+            "a",
+            {"a", "pkg"},
+            [],
+            [],
+            id="from-import-module-attributes",
+        ),
     ],
 )
 def test_e2e(  # noqa: PLR0913
@@ -433,41 +469,59 @@ def test_e2e(  # noqa: PLR0913
     expected_missing: list[str],
     expected_maybe_missing: list[str],
 ):
-    test_path = [os.fspath(tmp_path), STDLIB_PATH]
-    create_file_tree(tmp_path, source)
+    root = os.fspath(tmp_path)
+    test_path = [root, STDLIB_PATH]
+    create_file_tree(root, source)
 
     run_module_finder(test_path, import_this, expected_modules, expected_missing, expected_maybe_missing)
 
 
-def test_e2e_bytecode(tmp_path: Path):
-    test_path = [os.fspath(tmp_path), STDLIB_PATH]
+@pytest.fixture(scope="session")
+def compiled_bytecode(tmp_path_factory: pytest.TempPathFactory) -> bytes:
+    """The contents of a bytecode file for a small module, compiled once per session."""
 
-    # Set up a bytecode file without an accompanying source file.
-    base_path = tmp_path / "a"
-    source_path = base_path.with_suffix(importlib.machinery.SOURCE_SUFFIXES[0])
-    bytecode_path = base_path.with_suffix(importlib.machinery.BYTECODE_SUFFIXES[0])
+    bytecode_dir = tmp_path_factory.mktemp("bytecode")
+    source_path = bytecode_dir / ("a" + SOURCE_SUFFIX)
+    bytecode_path = bytecode_dir / ("a" + BYTECODE_SUFFIX)
     source_path.write_bytes(b"testing_modulefinder = True\n")
     py_compile.compile(os.fspath(source_path), cfile=os.fspath(bytecode_path))
-    source_path.unlink()
+    return bytecode_path.read_bytes()
+
+
+def test_e2e_bytecode(tmp_path: Path, compiled_bytecode: bytes):
+    root = os.fspath(tmp_path)
+    test_path = [root, STDLIB_PATH]
+
+    # Set up a bytecode file without an accompanying source file.
+    bytecode_path = tmp_path / ("a" + BYTECODE_SUFFIX)
+    write_file(bytecode_path, compiled_bytecode)
 
     run_module_finder(test_path, "a", {"a"}, [], [])
 
 
-def test_e2e_active_path_replacements(tmp_path: Path):
-    test_path = [os.fspath(tmp_path), STDLIB_PATH]
+@pytest.mark.parametrize(
+    ("old_name", "expected_replaced"),
+    [
+        pytest.param("hello.py", True, id="active"),
+        pytest.param("hi.py", False, id="inactive"),
+    ],
+)
+def test_e2e_path_replacements(tmp_path: Path, old_name: str, expected_replaced: bool):
+    root = os.fspath(tmp_path)
+    test_path = [root, STDLIB_PATH]
 
     source_path = tmp_path / "hello.py"
-    source_path.write_text(
-        dedent("""\
+    write_file(
+        source_path,
+        source_bytes("""\
             print('hello world')
             def hello():
                 return "hello"
-            
-        """)
+        """),
     )
-    new_path = source_path.with_name("goodbye.py")
+    new_path = tmp_path / "goodbye.py"
 
-    path_replacements = [(os.fspath(source_path), os.fspath(new_path))]
+    path_replacements = [(os.fspath(tmp_path / old_name), os.fspath(new_path))]
     mf = modulefinder.ModuleFinder(test_path, path_replacements)
     mf.import_as_module("hello")
 
@@ -475,31 +529,120 @@ def test_e2e_active_path_replacements(tmp_path: Path):
     hello_code = hello_module.__code__
 
     assert hello_code is not None
-    assert hello_code.co_filename == os.fspath(new_path)
+    assert hello_code.co_filename == os.fspath(new_path if expected_replaced else source_path)
 
 
-def test_e2e_inactive_path_replacements(tmp_path: Path):
-    test_path = [os.fspath(tmp_path), STDLIB_PATH]
+def test_import_as_file_reuses_scanned_module(tmp_path: Path):
+    root = os.fspath(tmp_path)
+    test_path = [root, STDLIB_PATH]
+    create_file_tree(root, {"a.py": b"import b\n", "b.py": b"import c\n", "c.py": b""})
 
-    source_path = tmp_path / "hello.py"
-    source_path.write_text(
-        dedent("""\
-            print('hello world')
-            def hello():
-                return "hello"
-            
-        """)
+    mf = modulefinder.ModuleFinder(test_path)
+    mf.import_as_file(tmp_path / "a.py")
+    b_module = mf.modules["b"]
+
+    # b was already found through a, so importing its file again shouldn't replace it.
+    mf.import_as_file(tmp_path / "b.py")
+
+    assert mf.modules.keys() == {"a", "b", "c"}
+    assert mf.modules["b"] is b_module
+    assert b_module.__mf_global_names__ == {"c"}
+
+
+def test_import_as_file_provides_missing_module(tmp_path: Path):
+    root = os.fspath(tmp_path)
+    test_path = [os.fspath(tmp_path / "path"), STDLIB_PATH]
+    create_file_tree(
+        root,
+        {
+            "path": {"a.py": b"import b\n", "c.py": b"import b\n"},
+            "elsewhere": {"b.py": b""},
+        },
     )
 
-    unrelated_old_path = source_path.with_name("hi.py")
-    new_path = source_path.with_name("goodbye.py")
+    mf = modulefinder.ModuleFinder(test_path)
+    mf.import_as_module("a")
+    assert mf.bad_modules["b"] == {"a"}
+
+    # Once b has been found through its file, importing it shouldn't fail anymore.
+    mf.import_as_file(tmp_path / "elsewhere" / "b.py")
+    mf.import_as_module("c")
+
+    assert mf.modules.keys() == {"a", "b", "c"}
+    assert mf.bad_modules["b"] == {"a"}
+
+
+def test_scan_opcodes_finds_stores_and_imports():
+    code = compile(
+        source_bytes("""\
+            import a
+            import b.c as bc
+            from d import e, f
+            from . import g
+            from ..h import *
+            x = 1
+        """),
+        "<test>",
+        "exec",
+    )
 
-    path_replacements = [(os.fspath(unrelated_old_path), os.fspath(new_path))]
-    mf = modulefinder.ModuleFinder(test_path, path_replacements)
-    mf.import_as_module("hello")
+    store_names, imports = modulefinder._scan_opcodes(code)  # pyright: ignore [reportPrivateUsage]
 
-    hello_module = mf.modules["hello"]
-    hello_code = hello_module.__code__
+    assert store_names == ("a", "bc", "e", "f", "g", "x")
+    assert imports == (
+        ("a", None, 0),
+        ("b.c", None, 0),
+        ("d", ("e", "f"), 0),
+        ("", ("g",), 1),
+        ("h", ("*",), 2),
+    )
 
-    assert hello_code is not None
-    assert hello_code.co_filename == os.fspath(source_path)
+
+def test_scan_opcodes_small_int_level(monkeypatch: pytest.MonkeyPatch):
+    # 3.14+ loads an import's level with LOAD_SMALL_INT. Elsewhere, let LOAD_FAST stand in for it, so that this path is
+    # checked on every version. Like LOAD_SMALL_INT, it takes an argument and has no inline cache entries, so co_code
+    # keeps it as-is.
+    load_small_int = dis.opmap.get("LOAD_SMALL_INT")
+    if load_small_int is None:
+        load_small_int = dis.opmap["LOAD_FAST"]
+        monkeypatch.setattr(modulefinder, "_LOAD_SMALL_INT", load_small_int)
+
+    # The bytecode of "from ..a import b", with the level loaded by LOAD_SMALL_INT.
+    co_code = bytes(
+        (
+            load_small_int, 2,
+            dis.opmap["LOAD_CONST"], 0,
+            dis.opmap["IMPORT_NAME"], 0,
+            dis.opmap["IMPORT_FROM"], 1,
+            dis.opmap["STORE_NAME"], 1,
+        )
+    )  # fmt: skip
+    code = compile("", "<test>", "exec").replace(co_code=co_code, co_consts=(("b",),), co_names=("a", "b"))
+    assert code.co_code == co_code
+
+    store_names, imports = modulefinder._scan_opcodes(code)  # pyright: ignore [reportPrivateUsage]
+
+    assert store_names == ("b",)
+    assert imports == (("a", ("b",), 2),)
+
+
+def test_scan_opcodes_nested_code():
+    code = compile(
+        source_bytes("""\
+            def without_names():
+                return 1
+
+            def with_imports():
+                import a
+                from . import b
+        """),
+        "<test>",
+        "exec",
+    )
+    without_names, with_imports = (const for const in code.co_consts if isinstance(const, types.CodeType))
+
+    scan_opcodes = modulefinder._scan_opcodes  # pyright: ignore [reportPrivateUsage]
+
+    # Code without any names takes the early exit, while code whose only interesting opcodes are imports doesn't.
+    assert scan_opcodes(without_names) == ((), ())
+    assert scan_opcodes(with_imports) == ((), (("a", None, 0), ("", ("b",), 1)))